@@ -0,0 +1,66 @@
+"""Numeric kernels of data_load, compiled with Numba on their first call. They return None when Numba is not available, so data_load can use its numpy implementations"""
+
+from typing import Optional
+import functools
+
+import numpy as np
+
+
+@functools.lru_cache(maxsize=None)
+def _compile(kernel):
+    """Compile a kernel with Numba, only the first time it is requested. None if Numba can not be imported"""
+    # Numba is optional and slow to import, so it is only imported when a kernel is first called. An installed Numba can
+    # still fail to import (e.g. if it does not support the installed NumPy), which counts as not available
+    try:
+        import numba
+    except ImportError:
+        return None
+    return numba.njit(cache=True)(kernel)
+
+
+def _filter_and_complete(
+    is_filtered: np.ndarray,
+    claim_premise: np.ndarray,
+    boundaries: np.ndarray,
+    random: np.ndarray,
+) -> np.ndarray:
+    """Get the filtered rows (is_filtered) of each proposal (delimited by boundaries), followed by the same number of random rows of non-arguments of the proposal, or all of them if there are not enough. The non-arguments are sampled in a single pass with Algorithm R, using the random number in [0, 1) of each row"""
+    rows = np.empty(2 * len(is_filtered), dtype=np.int64)
+    reservoir = np.empty(len(is_filtered), dtype=np.int64)
+    size = 0
+    for proposal in range(len(boundaries) - 1):
+        start = boundaries[proposal]
+        end = boundaries[proposal + 1]
+        filtered = 0
+        for row in range(start, end):
+            if is_filtered[row]:
+                rows[size] = row
+                size += 1
+                filtered += 1
+        seen = 0
+        for row in range(start, end):
+            if claim_premise[row] != 1:
+                if seen < filtered:
+                    reservoir[seen] = row
+                else:
+                    chosen = int(random[row] * (seen + 1))
+                    if chosen < filtered:
+                        reservoir[chosen] = row
+                seen += 1
+        taken = min(seen, filtered)
+        rows[size : size + taken] = np.sort(reservoir[:taken])
+        size += taken
+    return rows[:size]
+
+
+def filter_and_complete(
+    is_filtered: np.ndarray,
+    claim_premise: np.ndarray,
+    boundaries: np.ndarray,
+    random: np.ndarray,
+) -> Optional[np.ndarray]:
+    """Run _filter_and_complete compiled with Numba. None if Numba is not available, the kernel is never run as plain Python"""
+    kernel = _compile(_filter_and_complete)
+    if kernel is None:
+        return None
+    return kernel(is_filtered, claim_premise, boundaries, random)
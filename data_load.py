@@ -1,91 +1,167 @@
-import csv
 from typing import (
     Dict,
     List,
+    TextIO,
+    Tuple,
 )
-import random
+import csv
+import functools
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from _kernels import filter_and_complete
 
 
 filename = "ChatGPT-evaluation-v2.txt"
+encoding = "cp1252"
+
+# Columns of the evaluation file with the id and the text of each argument
+ARGUMENT_COLUMNS = ["Id elemento", "Valor"]
+# Columns of the evaluation file with the evaluation of each argument, in the order expected by Evaluation
+EVALUATION_COLUMNS = [
+    "Claim?",
+    "Claim+premise?\nWHY?",
+    "Relacionado con aspecto?",
+    "Validación premisa(s)",
+    "Coherencia lógica p->c",
+    "Consistencia p1 <> p2",
+    "Persuasión",
+    "Apelación emocioal/ética (pathos/ethos)",
+]
+COLUMNS = ["Tipo elemento", "Id propuesta"] + ARGUMENT_COLUMNS + EVALUATION_COLUMNS
+
+# Fields of the evaluation of an argument, in the order of EVALUATION_COLUMNS
+FIELDS = [
+    "claim",
+    "claim_premise",
+    "aspect",
+    "premise_validation",
+    "coherence",
+    "consistence",
+    "persuasion",
+    "emotional_ethic",
+]
+FIELD_IDX = {field_name: column for column, field_name in enumerate(FIELDS)}
+# Value stored in the int8 evaluation fields that do not apply to an argument (-1 is a valid claim value)
+MISSING = np.iinfo(np.int8).min
+
+_rng = np.random.default_rng()
+# Rows from which filter_by_completed uses the Numba kernel. Below it the numpy implementation is faster than
+# importing Numba and loading the compiled kernel (a few hundred milliseconds, once per process)
+NUMBA_MIN_ROWS = 1_000_000
 
 
 def take_n_random_elements(data: List, n: int) -> List:
     """Take n random elements from a list of data. If n is greater than the length of the data, return the data as it is."""
     if n >= len(data):
         return data
-    return random.sample(data, n)
+    return [data[i] for i in _rng.choice(len(data), n, replace=False)]
+
+
+def take_n_random_elements_by_group(
+    data: np.ndarray, groups: np.ndarray, n: np.ndarray
+) -> np.ndarray:
+    """Take n[group] random elements of each group from an array of data sorted by group, given the group of each element. If n[group] is greater than the size of the group, take the whole group. The result keeps the order of the data"""
+    # Shuffle the elements inside each group and keep the first n[group] of every group
+    # float64 keys, ties (which lexsort breaks by position, favouring the first elements) are practically impossible
+    order = np.lexsort((_rng.random(len(data)), groups))
+    shuffled_groups = groups[order]
+    rank = np.arange(len(data)) - np.searchsorted(shuffled_groups, shuffled_groups)
+    # Only the chosen elements are gathered, the shuffled copy of the whole data is never built
+    return np.sort(data[order[rank < n[shuffled_groups]]])
+
+
+def _field_values(values) -> List[int]:
+    """Get the list of values to filter a field by from a value or a list of values, mapping None to MISSING. The values are not cast, they are compared with the int8 fields as given"""
+    if not isinstance(values, list):
+        values = [values]
+    return [MISSING if value is None else value for value in values]
 
 
 class Evaluation:
     """Class to store the evaluation of an argument"""
 
-    claim: int
-    claim_premise: int = None
-    aspect: int = None
-    premise_validation: int = None
-    coherence: int = None
-    consistence: int = None
-    persuasion: int = None
-    emotional_ethic: int = None
+    __slots__ = ("values",)
 
-    def __init__(
-        self,
-        claim: str,
-        claim_premise: str,
-        aspect: str,
-        premise_validation: str,
-        coherence: str,
-        consistence: str,
-        persuasion: str,
-        emotional_ethic: str,
-    ):
-        """Initialize the evaluation of an argument"""
-        self.claim = int(claim)
-        if claim == "1":
-            self.claim_premise = int(claim_premise)
-            self.aspect = int(aspect)
-            if claim_premise == "1":
-                self.premise_validation = int(premise_validation)
-                self.coherence = int(coherence)
-                self.consistence = int(consistence)
-                self.persuasion = int(persuasion)
-                self.emotional_ethic = int(emotional_ethic)
+    values: np.ndarray
+
+    def __init__(self, values: np.ndarray):
+        """Initialize the evaluation of an argument from its row of evaluation fields, in the order of FIELDS"""
+        self.values = values
+
+    def __getattr__(self, field_name: str) -> int:
+        """Get the value of a field of the evaluation as an attribute"""
+        if field_name not in FIELD_IDX:
+            raise AttributeError(field_name)
+        return self.get_field(field_name)
 
     def get_field(self, field_name: str) -> int:
-        """Get the value of a field of the evaluation"""
-        return getattr(self, field_name)
+        """Get the value of a field of the evaluation, None if the field does not apply to the argument"""
+        return self.get_field_by_column(FIELD_IDX[field_name])
+
+    def get_field_by_column(self, column: int) -> int:
+        """Get the value of the field of the evaluation in the given column of FIELDS, None if the field does not apply to the argument"""
+        value = self.values[column]
+        if value == MISSING:
+            return None
+        return int(value)
+
+    def get_fields(self) -> List[int]:
+        """Get the values of all the fields of the evaluation, in the order of FIELDS, None for the fields that do not apply to the argument"""
+        return [None if value == MISSING else value for value in self.values.tolist()]
 
     def format_print(self) -> str:
         """Format the evaluation to print it in a human-readable way"""
+        (
+            claim,
+            claim_premise,
+            aspect,
+            premise_validation,
+            coherence,
+            consistence,
+            persuasion,
+            emotional_ethic,
+        ) = self.get_fields()
         cad = (
             "Claim: "
-            + str(self.claim)
+            + str(claim)
             + ", Claim+premise: "
-            + str(self.claim_premise)
+            + str(claim_premise)
             + ", Aspect related: "
-            + str(self.aspect)
+            + str(aspect)
             + ", Premise validation: "
-            + str(self.premise_validation)
+            + str(premise_validation)
             + ", Coherence: "
-            + str(self.coherence)
+            + str(coherence)
             + ", Consistence: "
-            + str(self.consistence)
+            + str(consistence)
             + ", Persuasion: "
-            + str(self.persuasion)
+            + str(persuasion)
             + ", Emotional/ethic: "
-            + str(self.emotional_ethic)
+            + str(emotional_ethic)
         )
         return cad
 
     def format_file(self, fields: List[str]) -> str:
         """Format the evaluation to save it in a file with the specified fields"""
-        cad = "\t".join([str(self.get_field(field)) for field in fields])
+        values = self.get_fields()
+        cad = "\t".join([str(values[FIELD_IDX[field]]) for field in fields])
         return cad
 
 
 class EvaluatedArgument:
     """Class to store an argument with its evaluation"""
 
+    __slots__ = ("id_proposal", "id_argument", "argument", "evaluation")
+
+    id_proposal: int
+    id_argument: int
+    argument: str
+    evaluation: Evaluation
+
     def __init__(
         self, id_proposal: int, id_argument: int, argument: str, evaluation: Evaluation
     ):
@@ -114,84 +190,143 @@ class EvaluatedArgument:
 
     def format_file(self, fields: List[str]) -> str:
         """Format the argument to save it in a file with the specified fields"""
-        cad = (
-            str(self.id_argument)
-            + "\t"
-            + self.argument
-            + "\t"
-            + self.evaluation.format_file(fields)
+        cad = "\t".join(
+            [str(self.id_argument), self.argument, self.evaluation.format_file(fields)]
         )
         return cad
 
 
 class Corpus:
-    """Class to store a corpus of arguments with their evaluations"""
+    """Class to store a corpus of arguments with their evaluations, as flat arrays with a row per argument where the rows of each proposal are contiguous"""
 
-    arguments_dict: Dict[int, List[EvaluatedArgument]]
+    __slots__ = ("proposal_ids", "ids", "arguments", "fields")
 
-    def __init__(self):
-        """Initialize the corpus of arguments"""
-        self.arguments_dict = {}
+    proposal_ids: np.ndarray
+    ids: np.ndarray
+    arguments: np.ndarray
+    fields: np.ndarray
 
-    def _append_argument(self, proposal_id: int, argument: EvaluatedArgument) -> None:
-        """Append an argument to the corpus of arguments"""
-        if proposal_id in self.arguments_dict:
-            self.arguments_dict[proposal_id].append(argument)
-        else:
-            self.arguments_dict[argument.id_proposal] = [argument]
+    def __init__(
+        self,
+        proposal_ids: np.ndarray = None,
+        ids: np.ndarray = None,
+        arguments: np.ndarray = None,
+        fields: np.ndarray = None,
+    ):
+        """Initialize the corpus of arguments from the arrays of proposal ids, argument ids, argument texts and int8 evaluation fields of its rows. Empty if no arrays are passed"""
+        if proposal_ids is None:
+            proposal_ids = np.empty(0, dtype=np.int32)
+            ids = np.empty(0, dtype=np.int32)
+            arguments = np.empty(0, dtype=object)
+            fields = np.empty((0, len(FIELDS)), dtype=np.int8)
+        self.proposal_ids = proposal_ids
+        self.ids = ids
+        self.arguments = arguments
+        self.fields = fields
+
+    def group_by_proposal(self) -> Dict[int, List[EvaluatedArgument]]:
+        """Get the arguments of the corpus grouped by proposal. The dict and its arguments are a snapshot built from the arrays on each call, changing them does not change the corpus"""
+        arguments_dict = {}
+        ids = self.ids.tolist()
+        boundaries = proposal_boundaries(self.proposal_ids).tolist()
+        for start, end in zip(boundaries[:-1], boundaries[1:]):
+            proposal_id = int(self.proposal_ids[start])
+            # A corpus built from arrays that do not keep the rows of a proposal together has several runs of it
+            arguments_dict.setdefault(proposal_id, []).extend(
+                EvaluatedArgument(
+                    proposal_id, id_argument, argument, Evaluation(values)
+                )
+                for id_argument, argument, values in zip(
+                    ids[start:end], self.arguments[start:end], self.fields[start:end]
+                )
+            )
+        return arguments_dict
+
+    def select(self, rows: np.ndarray):
+        """Create a corpus with the given rows (a mask or an array of positions) of the corpus. NOT MODIFIES THE ORIGINAL CORPUS"""
+        return Corpus(
+            self.proposal_ids[rows],
+            self.ids[rows],
+            self.arguments[rows],
+            self.fields[rows],
+        )
 
     def append_all_arguments(
         self, proposal_id: int, arguments: List[EvaluatedArgument]
     ) -> None:
-        """Append a list of arguments to the corpus of arguments"""
-        for argument in arguments:
-            self._append_argument(proposal_id, argument)
+        """Append a list of arguments to the corpus of arguments, after the last argument of the proposal if it is already in the corpus"""
+        if not arguments:
+            return
+        rows = np.flatnonzero(self.proposal_ids == proposal_id)
+        position = rows[-1] + 1 if len(rows) else len(self.proposal_ids)
+        self.proposal_ids = np.insert(
+            self.proposal_ids, position, np.full(len(arguments), proposal_id)
+        )
+        self.ids = np.insert(
+            self.ids, position, [argument.id_argument for argument in arguments]
+        )
+        texts = np.empty(len(arguments), dtype=object)
+        texts[:] = [argument.argument for argument in arguments]
+        self.arguments = np.insert(self.arguments, position, texts)
+        self.fields = np.insert(
+            self.fields,
+            position,
+            np.stack([argument.get_evaluation().values for argument in arguments]),
+            axis=0,
+        )
 
     def filter_by_completed(self, field_name: str, values):
         """Filter the corpus of arguments by the value of a field of the evaluation of the arguments, completed with the same number of non-arguments. NOT MODIFIES THE ORIGINAL CORPUS"""
-        filtered_corpus = Corpus()
-
-        if not isinstance(values, list):
-            values = [values]
-
-        for proposal_id in self.arguments_dict.keys():
-            arguments = self.arguments_dict[proposal_id]
-            arguments = [
-                argument
-                for argument in arguments
-                if argument.get_evaluation().get_field(field_name) in values
-            ]
-            number_filtered = len(arguments)
-            filtered_corpus.append_all_arguments(proposal_id, arguments)
-            non_arguments = self.arguments_dict[proposal_id]
-            non_arguments = [
-                argument
-                for argument in non_arguments
-                if argument.get_evaluation().get_field("claim_premise") != 1
-            ]
-            non_arguments = take_n_random_elements(non_arguments, number_filtered)
-            filtered_corpus.append_all_arguments(proposal_id, non_arguments)
-        return filtered_corpus
+        values = _field_values(values)
+        boundaries = proposal_boundaries(self.proposal_ids)
+        # Matched by numpy in both implementations, so the values are compared as they are and never cast to int8
+        is_filtered = np.isin(self.fields[:, FIELD_IDX[field_name]], values)
+        if len(self.fields) >= NUMBA_MIN_ROWS:
+            rows = filter_and_complete(
+                is_filtered,
+                self.fields[:, FIELD_IDX["claim_premise"]],
+                boundaries,
+                _rng.random(len(self.fields)),
+            )
+            if rows is not None:
+                return self.select(rows)
+        return self.select(
+            _filter_and_complete(
+                is_filtered, self.fields[:, FIELD_IDX["claim_premise"]], boundaries
+            )
+        )
 
     def format_print(self) -> str:
         """Format the corpus of arguments to print it in a human-readable way"""
-        cad = ""
-        for proposal_id in self.arguments_dict.keys():
-            cad += "Proposal id: " + str(proposal_id) + "\n\n"
-            arguments = self.arguments_dict[proposal_id]
-            for argument in arguments:
-                cad += argument.format_print()
+        parts = []
+        for proposal_id, arguments in self.group_by_proposal().items():
+            parts.append("Proposal id: " + str(proposal_id) + "\n\n")
+            parts.extend(argument.format_print() for argument in arguments)
 
-        return cad
+        return "".join(parts)
 
     def format_file(self, fields: List[str]) -> str:
         """Format the corpus of arguments to save it in a file with the specified fields"""
-        cad = "proposal_id\targument_id\targument\t" + "\t".join(fields) + "\n"
-        for proposal_id in self.arguments_dict.keys():
-            arguments = self.arguments_dict[proposal_id]
-            for argument in arguments:
-                cad += str(proposal_id) + "\t" + argument.format_file(fields) + "\n"
-        return cad
+        file = io.StringIO()
+        self._write_rows(file, fields)
+        return file.getvalue()
+
+    def _write_rows(self, file: TextIO, fields: List[str]) -> None:
+        """Write the corpus of arguments as TSV with the specified fields in an open file, header first"""
+        writer = csv.writer(file, delimiter="\t", lineterminator="\n")
+        writer.writerow(["proposal_id", "argument_id", "argument"] + fields)
+        # Written straight from the arrays, without building an EvaluatedArgument and an Evaluation per row
+        values = self.fields[:, [FIELD_IDX[field] for field in fields]]
+        values = np.where(values == MISSING, "None", values.astype(str))
+        writer.writerows(
+            (proposal_id, id_argument, argument, *row)
+            for proposal_id, id_argument, argument, row in zip(
+                self.proposal_ids.tolist(),
+                self.ids.tolist(),
+                self.arguments,
+                values.tolist(),
+            )
+        )
 
     def save_to_file(
         self,
@@ -208,193 +343,242 @@ class Corpus:
         ],
     ) -> None:
         """Save the corpus of arguments in a file with the specified fields"""
-        with open(filename, "w", encoding="utf-8") as file:
-            file.write(self.format_file(fields))
+        with open(filename, "w", encoding="utf-8", newline="") as file:
+            self._write_rows(file, fields)
 
     def filter_by(self, field_name: str, values):
         """Filter the corpus of arguments by the value of a field of the evaluation of the arguments. NOT MODIFIES THE ORIGINAL CORPUS"""
-        filtered_corpus = Corpus()
+        values = _field_values(values)
+        return self.select(np.isin(self.fields[:, FIELD_IDX[field_name]], values))
+
+
+def read_arguments(path: str = None) -> pd.DataFrame:
+    """Read the rows of type 'Argumento' of the evaluation file (filename by default), keeping only the columns needed to build the corpus"""
+    if path is None:
+        path = filename
+    # 'Tipo elemento' and the evaluation columns only take a few values, as categories each value is stored once
+    # and the rows hold integer codes
+    dtype = dict.fromkeys(COLUMNS, str)
+    dtype["Tipo elemento"] = "category"
+    dtype.update(dict.fromkeys(EVALUATION_COLUMNS, "category"))
+    data = pd.read_csv(
+        path,
+        sep="\t",
+        usecols=COLUMNS,
+        dtype=dtype,
+        na_filter=False,
+        engine="c",
+        encoding=encoding,
+        memory_map=True,
+    )
+    return data[data["Tipo elemento"] == "Argumento"].reset_index(drop=True)
 
-        if not isinstance(values, list):
-            values = [values]
 
-        for proposal_id in self.arguments_dict.keys():
-            arguments = self.arguments_dict[proposal_id]
-            arguments = [
-                argument
-                for argument in arguments
-                if argument.get_evaluation().get_field(field_name) in values
-            ]
-            filtered_corpus.append_all_arguments(proposal_id, arguments)
-        return filtered_corpus
+def _field_value(value: str) -> int:
+    """Convert a value of an evaluation column to int, MISSING if it is empty or not a number"""
+    try:
+        return int(value)
+    except ValueError:
+        return MISSING
 
 
-# optimized, only one iteration
-def classify_arguments_or_not_opt() -> Corpus:
-    """Classify the arguments as arguments or not arguments based on the value of the field 'Claim+premise?WHY?' of the evaluation of the arguments"""
-    proposal_id = -1
-    corpus = Corpus()
-    with open(filename, "r", newline="") as file:
-        reader = csv.DictReader(file, delimiter="\t")
-        for row in reader:
-            if row["Tipo elemento"] != "Argumento":
-                continue
-            if int(row["Id propuesta"]) != proposal_id:
-                if proposal_id != -1:
-                    eval_args_number = len(evaluated_data)
-                    non_evaluated_args_number = len(non_evaluated_data)
-                    if eval_args_number < non_evaluated_args_number:
-                        non_evaluated_data = take_n_random_elements(
-                            non_evaluated_data, eval_args_number
-                        )
-                    elif non_evaluated_args_number < eval_args_number:
-                        evaluated_data = take_n_random_elements(
-                            evaluated_data, non_evaluated_args_number
-                        )
-                    corpus.append_all_arguments(proposal_id, evaluated_data)
-                    corpus.append_all_arguments(proposal_id, non_evaluated_data)
-                proposal_id = int(row["Id propuesta"])
-                evaluated_data = []
-                non_evaluated_data = []
-            evaluation = Evaluation(
-                row["Claim?"],
-                row["Claim+premise?\nWHY?"],
-                row["Relacionado con aspecto?"],
-                row["Validación premisa(s)"],
-                row["Coherencia lógica p->c"],
-                row["Consistencia p1 <> p2"],
-                row["Persuasión"],
-                row["Apelación emocioal/ética (pathos/ethos)"],
+def evaluation_fields(data: pd.DataFrame) -> np.ndarray:
+    """Convert the evaluation columns of the rows to an int8 matrix with a column per field of FIELDS. The fields that only apply to claims (or to claims with premise) are MISSING for the rest of rows"""
+    fields = np.empty((len(data), len(FIELDS)), dtype=np.int8)
+    for column, name in enumerate(EVALUATION_COLUMNS):
+        values = data[name].cat
+        # Each distinct value is converted once, the rows take it from the lookup table through their category code
+        table = np.array(
+            [_field_value(category) for category in values.categories], dtype=np.int8
+        )
+        fields[:, column] = table[values.codes]
+    claim = fields[:, FIELD_IDX["claim"]] == 1
+    claim_premise = claim & (fields[:, FIELD_IDX["claim_premise"]] == 1)
+    applies = np.column_stack([np.ones_like(claim), claim, claim] + [claim_premise] * 5)
+    invalid = applies & (fields == MISSING)
+    if invalid.any():
+        row, column = np.argwhere(invalid)[0]
+        raise ValueError(
+            "Missing or invalid value of "
+            + FIELDS[column]
+            + " for argument "
+            + str(data["Id elemento"].iloc[row])
+        )
+    fields[~applies] = MISSING
+    return fields
+
+
+def proposal_boundaries(proposal_ids: np.ndarray) -> np.ndarray:
+    """Get the positions where each run of rows of the same proposal starts, followed by the number of rows"""
+    if len(proposal_ids) == 0:
+        return np.zeros(1, dtype=np.int64)
+    return np.r_[0, np.flatnonzero(np.diff(proposal_ids)) + 1, len(proposal_ids)]
+
+
+def _filter_and_complete(
+    is_filtered: np.ndarray, claim_premise: np.ndarray, boundaries: np.ndarray
+) -> np.ndarray:
+    """Get the filtered rows (is_filtered) of each proposal (delimited by boundaries), followed by the same number of random rows of non-arguments of the proposal, or all of them if there are not enough. numpy implementation of _kernels.filter_and_complete"""
+    proposals = _row_proposals(boundaries)
+    filtered_counts = np.add.reduceat(is_filtered.astype(np.int32), boundaries[:-1])
+    non_arguments = np.flatnonzero(claim_premise != 1)
+    non_arguments = take_n_random_elements_by_group(
+        non_arguments, proposals[non_arguments], filtered_counts
+    )
+    rows = np.concatenate((np.flatnonzero(is_filtered), non_arguments))
+    # Group the rows by proposal again, the filtered arguments before the non-arguments
+    return rows[np.argsort(proposals[rows], kind="stable")]
+
+
+def check_filter_and_complete(corpus: Corpus = None) -> None:
+    """Check that the Numba kernel of filter_by_completed takes the same number of rows of each proposal as the numpy implementation, for every value of every field of the corpus. Raises ValueError if they differ, does nothing if Numba is not available. Uses the given complete corpus instead of reading the file again if it is passed"""
+    if corpus is None:
+        corpus = create_complete_corpus()
+    boundaries = proposal_boundaries(corpus.proposal_ids)
+    proposals = _row_proposals(boundaries)
+    claim_premise = corpus.fields[:, FIELD_IDX["claim_premise"]]
+    for field_name in FIELDS:
+        column = corpus.fields[:, FIELD_IDX[field_name]]
+        for value in np.unique(column).tolist():
+            is_filtered = column == value
+            rows = filter_and_complete(
+                is_filtered, claim_premise, boundaries, _rng.random(len(column))
             )
-            evaluated_argument = EvaluatedArgument(
-                proposal_id, int(row["Id elemento"]), row["Valor"], evaluation
+            if rows is None:
+                return
+            expected = _filter_and_complete(is_filtered, claim_premise, boundaries)
+            counts = np.bincount(proposals[rows], minlength=len(boundaries) - 1)
+            expected_counts = np.bincount(
+                proposals[expected], minlength=len(boundaries) - 1
             )
-            if row["Claim+premise?\nWHY?"] == "1":
-                evaluated_data.append(evaluated_argument)
-            else:
-                non_evaluated_data.append(evaluated_argument)
-        return corpus
+            if not np.array_equal(counts, expected_counts):
+                raise ValueError(
+                    "The Numba kernel of filter_by_completed takes different rows than numpy for "
+                    + field_name
+                    + " = "
+                    + str(value)
+                )
+
+
+def _row_proposals(boundaries: np.ndarray) -> np.ndarray:
+    """Get the number of the proposal (run of rows, as delimited by proposal_boundaries) of every row"""
+    return np.repeat(np.arange(len(boundaries) - 1), np.diff(boundaries))
+
+
+def _balance(
+    corpus: Corpus, is_evaluated: np.ndarray, is_non_evaluated: np.ndarray
+) -> Corpus:
+    """Take the same number of rows of arguments (is_evaluated) and non-arguments (is_non_evaluated) of every proposal of the corpus, discarding random rows of the biggest group. The arguments of each proposal go before its non-arguments"""
+    boundaries = proposal_boundaries(corpus.proposal_ids)
+    proposals = _row_proposals(boundaries)
+    evaluated_rows = np.flatnonzero(is_evaluated)
+    non_evaluated_rows = np.flatnonzero(is_non_evaluated)
+    # Count first, then sample both groups of every proposal down to the smallest one
+    counts = np.minimum(
+        np.bincount(proposals[evaluated_rows], minlength=len(boundaries) - 1),
+        np.bincount(proposals[non_evaluated_rows], minlength=len(boundaries) - 1),
+    )
+    rows = np.concatenate(
+        (
+            take_n_random_elements_by_group(
+                evaluated_rows, proposals[evaluated_rows], counts
+            ),
+            take_n_random_elements_by_group(
+                non_evaluated_rows, proposals[non_evaluated_rows], counts
+            ),
+        )
+    )
+    return corpus.select(rows[np.argsort(proposals[rows], kind="stable")])
 
 
 # optimized, only one iteration
-def classify_arguments_or_not_with_aspect_opt() -> Corpus:
-    """Classify the arguments as arguments or not arguments based on the value of the fields 'Claim+premise?WHY?' and 'Relacionado con aspecto?' of the evaluation of the arguments"""
-    proposal_id = -1
-    corpus = Corpus()
-    with open(filename, "r", newline="") as file:
-        reader = csv.DictReader(file, delimiter="\t")
-        for row in reader:
-            if row["Tipo elemento"] != "Argumento":
-                continue
-            if int(row["Id propuesta"]) != proposal_id:
-                if proposal_id != -1:
-                    eval_args_number = len(evaluated_data)
-                    non_evaluated_args_number = len(non_evaluated_data)
-                    if eval_args_number < non_evaluated_args_number:
-                        non_evaluated_data = take_n_random_elements(
-                            non_evaluated_data, eval_args_number
-                        )
-                    elif non_evaluated_args_number < eval_args_number:
-                        evaluated_data = take_n_random_elements(
-                            evaluated_data, non_evaluated_args_number
-                        )
-                    corpus.append_all_arguments(proposal_id, evaluated_data)
-                    corpus.append_all_arguments(proposal_id, non_evaluated_data)
-                proposal_id = int(row["Id propuesta"])
-                evaluated_data = []
-                non_evaluated_data = []
-            evaluation = Evaluation(
-                row["Claim?"],
-                row["Claim+premise?\nWHY?"],
-                row["Relacionado con aspecto?"],
-                row["Validación premisa(s)"],
-                row["Coherencia lógica p->c"],
-                row["Consistencia p1 <> p2"],
-                row["Persuasión"],
-                row["Apelación emocioal/ética (pathos/ethos)"],
-            )
-            evaluated_argument = EvaluatedArgument(
-                proposal_id, int(row["Id elemento"]), row["Valor"], evaluation
-            )
-            if (
-                row["Claim+premise?\nWHY?"] == "1"
-                and row["Relacionado con aspecto?"] == "1"
-            ):
-                evaluated_data.append(evaluated_argument)
-            elif row["Claim+premise?\nWHY?"] != "1":
-                non_evaluated_data.append(evaluated_argument)
-        return corpus
+def classify_arguments_or_not_opt(corpus: Corpus = None) -> Corpus:
+    """Classify the arguments as arguments or not arguments based on the value of the field 'Claim+premise?WHY?' of the evaluation of the arguments. Uses the given complete corpus instead of reading the file again if it is passed"""
+    if corpus is None:
+        corpus = create_complete_corpus()
+    is_argument = corpus.fields[:, FIELD_IDX["claim_premise"]] == 1
+    return _balance(corpus, is_argument, ~is_argument)
+
+
+# optimized, only one iteration
+def classify_arguments_or_not_with_aspect_opt(corpus: Corpus = None) -> Corpus:
+    """Classify the arguments as arguments or not arguments based on the value of the fields 'Claim+premise?WHY?' and 'Relacionado con aspecto?' of the evaluation of the arguments. Uses the given complete corpus instead of reading the file again if it is passed"""
+    if corpus is None:
+        corpus = create_complete_corpus()
+    is_argument = corpus.fields[:, FIELD_IDX["claim_premise"]] == 1
+    is_aspect = corpus.fields[:, FIELD_IDX["aspect"]] == 1
+    return _balance(corpus, is_argument & is_aspect, ~is_argument)
 
 
 # not optimized, two iterations, result is the same as classify_arguments_or_not_opt
-def classify_arguments_or_not() -> Corpus:
-    """Classify the arguments as arguments or not arguments based on the value of the field 'Claim+premise?WHY?' of the evaluation of the arguments"""
-    corpus = create_complete_corpus()
+def classify_arguments_or_not(corpus: Corpus = None) -> Corpus:
+    """Classify the arguments as arguments or not arguments based on the value of the field 'Claim+premise?WHY?' of the evaluation of the arguments. Uses the given complete corpus instead of reading the file again if it is passed"""
+    if corpus is None:
+        corpus = create_complete_corpus()
     filtered_corpus = corpus.filter_by_completed("claim_premise", 1)
     return filtered_corpus
 
 
 # not optimized, two iterations. result is the same as classify_arguments_or_not_with_aspect_opt
-def classify_arguments_or_not_with_aspect() -> Corpus:
-    """Classify the arguments as arguments or not arguments based on the value of the fields 'Claim+premise?WHY?' and 'Relacionado con aspecto?' of the evaluation of the arguments"""
-    corpus = create_complete_corpus()
+def classify_arguments_or_not_with_aspect(corpus: Corpus = None) -> Corpus:
+    """Classify the arguments as arguments or not arguments based on the value of the fields 'Claim+premise?WHY?' and 'Relacionado con aspecto?' of the evaluation of the arguments. Uses the given complete corpus instead of reading the file again if it is passed"""
+    if corpus is None:
+        corpus = create_complete_corpus()
     filtered_corpus = corpus.filter_by_completed(
         "claim_premise", 1
     ).filter_by_completed("aspect", 1)
     return filtered_corpus
 
 
-def create_complete_corpus() -> Corpus:
-    """Create a corpus with all the arguments and non-arguments"""
-    proposal_id = -1
-    corpus = Corpus()
-    with open(filename, "r", newline="") as file:
-        reader = csv.DictReader(file, delimiter="\t")
-        for row in reader:
-            if row["Tipo elemento"] != "Argumento":
-                continue
-            if row["Id propuesta"] != proposal_id:
-                if proposal_id != -1:
-                    corpus.append_all_arguments(proposal_id, data)
-                proposal_id = int(row["Id propuesta"])
-                data = []
-            evaluation = Evaluation(
-                row["Claim?"],
-                row["Claim+premise?\nWHY?"],
-                row["Relacionado con aspecto?"],
-                row["Validación premisa(s)"],
-                row["Coherencia lógica p->c"],
-                row["Consistencia p1 <> p2"],
-                row["Persuasión"],
-                row["Apelación emocioal/ética (pathos/ethos)"],
-            )
-            evaluated_argument = EvaluatedArgument(
-                proposal_id, int(row["Id elemento"]), row["Valor"], evaluation
-            )
-            data.append(evaluated_argument)
-        return corpus
+@functools.lru_cache(maxsize=1)
+def _read_corpus_arrays(path: str, modification_time: int) -> Tuple[np.ndarray, ...]:
+    """Read the arrays of the complete corpus from the evaluation file. Cached by path and modification time, so the file is only parsed again when it changes. The arrays are read-only because they are shared by every corpus created from the cache"""
+    data = read_arguments(path)
+    proposal_ids = data["Id propuesta"].to_numpy(dtype=np.int32)
+    # The corpus needs the rows of each proposal to be contiguous, the stable sort keeps the order of the file inside them
+    order = np.argsort(proposal_ids, kind="stable")
+    arrays = (
+        proposal_ids[order],
+        data["Id elemento"].to_numpy(dtype=np.int32)[order],
+        data["Valor"].to_numpy(dtype=object)[order],
+        evaluation_fields(data)[order],
+    )
+    for array in arrays:
+        array.flags.writeable = False
+    return arrays
+
+
+def create_complete_corpus(path: str = None) -> Corpus:
+    """Create a corpus with all the arguments and non-arguments of the evaluation file (filename by default)"""
+    if path is None:
+        path = filename
+    return Corpus(*_read_corpus_arrays(path, os.stat(path).st_mtime_ns))
 
 
 def main():
     """Main function with examples of how to use the functions"""
 
+    # The file is read only once, the rest of corpora are derived from the complete corpus
+    complete_corpus = create_complete_corpus()
+
+    # 0. Check that the Numba kernel of filter_by_completed (only used with big corpora) agrees with numpy on the file
+    check_filter_and_complete(complete_corpus)
+
     # 1. Classify the arguments as arguments or not arguments based on the value of the field 'Claim+premise?WHY?' of the evaluation of the arguments. Stores only column 'claim_premise'
-    corpus = classify_arguments_or_not_opt()
+    corpus = classify_arguments_or_not_opt(complete_corpus)
     corpus.save_to_file("arguments.txt", ["claim_premise"])
 
     # 2. Classify the arguments as arguments or not arguments based on the value of the fields 'Claim+premise?WHY?' and 'Relacionado con aspecto?' of the evaluation of the arguments. Stores only columns 'claim_premise' and 'aspect'
-    corpus = classify_arguments_or_not_with_aspect_opt()
+    corpus = classify_arguments_or_not_with_aspect_opt(complete_corpus)
     corpus.save_to_file("arguments_with_aspect.txt", ["claim_premise", "aspect"])
 
     # 3. Create a corpus with all the arguments and non-arguments. Stores all the fields of the evaluation of the arguments
-    corpus = create_complete_corpus()
-    corpus.save_to_file("complete_corpus.txt")
+    complete_corpus.save_to_file("complete_corpus.txt")
 
     # 4. Create a corpus with all the arguments and non-arguments. Filter it by the value of the field 'premise_validation' and 'coherence' of the evaluation of the arguments and complete with the same number of non-arguments
-    corpus = create_complete_corpus()
-    corpus = corpus.filter_by_completed("premise_validation", 1).filter_by_completed(
-        "coherence", [1, 2]
-    )
+    corpus = complete_corpus.filter_by_completed(
+        "premise_validation", 1
+    ).filter_by_completed("coherence", [1, 2])
     corpus.save_to_file(
         "complete_corpus_filtered.txt",
         ["claim", "claim_premise", "premise_validation", "coherence"],